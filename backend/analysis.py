@@ -0,0 +1,434 @@
+"""
+Saf Python analiz aşamaları (OCR metni çıkarımı, regex kuralları, hata birleştirme,
+rübrik hesabı).
+
+main.py'den ayrı tutulur; böylece süreç havuzundaki işçiler API istemcilerini
+kurmadan yalnızca bu modülü içe aktarır ve derlenmiş kuralları bir kez yükler.
+"""
+import re
+import unicodedata
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional
+
+# =======================================================
+# 1) AKADEMİK REFERANS VERİ SETLERİ VE REGEX (DESENLER)
+# =======================================================
+
+MI_SUFFIX_BLACKLIST = {
+    "cami", "mami", "hami", "samimi", "kimi", "tümü", "ilhami", "resmi", "cismi",
+    "ismi", "yemi", "gemisi", "sevgilisi", "kendisi", "annesi", "babası", "abisi",
+    "mermi", "irmi", "vermi", "gemi", "komi", "kalemi", "problemi", "dönemi",
+    "gözlemi", "sistemi", "ailemi", "annemi", "babamı", "kardeşimi", "elimi", "evimi",
+    "gözümü", "sözümü", "yüzümü", "hacmi", "mülkiyeti", "hakimiyeti", 
+    "mevsimi", "seçimi", "üretimi", "tüketimi", "bölümü", "durumu"
+}
+
+PROPER_NOUNS_WHITELIST = {
+    "türkiye", "samsun", "istanbul", "ankara", "izmir", "atatürk", "mehmet", "ahmet",
+    "ayşe", "fatma", "ali", "veli", "atakum", "ilkadım", "canik", "çarşamba", "bafra",
+    "ingilizce", "türkçe", "almanca", "fransızca", "allah", "tanrı", "mardin", "mersin",
+    "batman", "bartın", "karaman", "erzincan", "van", "muş", 
+    "piazza", "city", "mall"
+}
+
+COMMON_NOUNS = {
+    "okul", "kitap", "kalem", "masa", "sandalye", "araba", "ev", "bahçe", "şehir", 
+    "insan", "çocuk", "kadın", "adam", "sokak", "mahalle", "köy", "su", "ekmek", 
+    "çay", "kahve", "çok", "pek", "güzel", "iyi", "kötü", "büyük", "küçük", 
+    "öğrenci", "öğretmen", "ders", "sınıf", "arkadaş", "sevgi", "saygı", "mutluluk",
+    "yemek", "bardak", "defter", "silgi", "çanta", "dolap", "kapı", "pencere"
+}
+
+QUESTION_WORDS = re.compile(r"\b(ne|neden|niçin|nasıl|nasil|kim|hangi|nerede|nereye|nereden|kaç|kac)\b", re.IGNORECASE | re.UNICODE)
+EMBEDDED_QUESTION_GUARDS = re.compile(r"\b(bilmiyorum|emin\s+değilim|sanmıyorum|hatırlamıyorum|diyemem|diyemiyorum|anlamıyorum|bilmez|sormadım)\b", re.IGNORECASE | re.UNICODE)
+
+PATTERNS = {
+    "TDK_03_SORU_EKI": re.compile(r"\b(\w{2,})(mi|mı|mu|mü)(?=[?.!,;:\s]|$)", re.IGNORECASE | re.UNICODE),
+    "TDK_04_SEY_AYRI": re.compile(r"\b(\w+)şey\b", re.IGNORECASE | re.UNICODE),
+    "TDK_06_YA_DA": re.compile(r"\byada\b", re.IGNORECASE | re.UNICODE),
+    "TDK_07_HER_SEY": re.compile(r"\bherşey\b", re.IGNORECASE | re.UNICODE),
+    "TDK_44_BIRKAC": re.compile(r"\bbir\s+kaç\b", re.IGNORECASE | re.UNICODE),
+    "TDK_45_HICBIR": re.compile(r"\bhiç\s+bir\b", re.IGNORECASE | re.UNICODE),
+    "TDK_46_PEKCOK": re.compile(r"\bpekçok\b", re.IGNORECASE | re.UNICODE),
+    "TDK_41_HERKES": re.compile(r"\bherkez\b", re.IGNORECASE | re.UNICODE),
+    "TDK_42_YALNIZ": re.compile(r"\byanliz\b", re.IGNORECASE | re.UNICODE),
+    "TDK_43_YANLIS": re.compile(r"\byanlis\b", re.IGNORECASE | re.UNICODE),
+    "TDK_47_INSALLAH": re.compile(r"\binsallah\b", re.IGNORECASE | re.UNICODE),
+    "TDK_23_KESME_GENEL": re.compile(r"\b([A-ZÇĞİÖŞÜa-zçğıöşü]{3,})'([a-zçğıöşü]+)\b", re.UNICODE)
+}
+
+PROPER_NOUN_SUFFIX_REGEX = re.compile(
+    r"\b([A-ZÇĞİÖŞÜ][a-zçğıöşü]{2,})(nin|nın|nun|nün|in|ın|un|ün|de|da|den|dan|e|a|i|ı|u|ü|le|la)\b",
+    re.UNICODE
+)
+
+CAPITALIZED_WORD_REGEX = re.compile(r"\b[A-ZÇĞİÖŞÜ][a-zçğıöşü]+\b", re.UNICODE)
+
+# =======================================================
+# 2) YARDIMCI FONKSİYONLAR
+# =======================================================
+def tr_lower(text: str) -> str:
+    return text.replace("İ", "i").replace("I", "ı").lower()
+
+def to_int(x, default=0):
+    try:
+        if x is None: return default
+        if isinstance(x, (int, float)): return int(x)
+        if isinstance(x, str):
+            clean = re.sub(r"[^\d\-]", "", x.split("/")[0])
+            return int(clean) if clean else default
+        return default
+    except: return default
+
+def get_sentence_starts(text: str) -> set:
+    starts = {0}
+    for match in re.finditer(r"[.!?]\s+", text):
+        starts.add(match.end())
+    return starts
+
+def apply_case(original: str, target: str) -> str:
+    """Kelimenin büyük/küçük harf durumunu koruyan akıllı yardımcı fonksiyon."""
+    if not original or not target: return target
+    if original.istitle() or (original[0].isupper() and original[1:].islower()):
+        return target.capitalize()
+    if original.isupper():
+        return target.upper()
+    return target
+
+# =======================================================
+# 3) CORE ALGORİTMA: DETERMİNİSTİK ANALİZ (REGEX)
+# =======================================================
+def analyze_deterministic(text: str) -> List[Dict[str, Any]]:
+    errors = []
+    sentence_starts = get_sentence_starts(text)
+    
+    # 1. STANDART REGEX HATALARI
+    for rule_id, pattern in PATTERNS.items():
+        for match in pattern.finditer(text):
+            whole_word = match.group(0)
+            
+            if rule_id == "TDK_03_SORU_EKI":
+                stem = match.group(1)
+                suffix = match.group(2)
+                span_end = match.end()
+                
+                if tr_lower(whole_word) in MI_SUFFIX_BLACKLIST:
+                    continue 
+                
+                base_correct = f"{stem} {suffix}"
+                correct_str = apply_case(whole_word, base_correct)
+                explanation = "Soru eki 'mi/mı' her zaman ayrı yazılır."
+
+                # Gelişmiş Soru İşareti Mantığı (Virgül/Nokta varsa soru işaretine çevirir)
+                next_char = text[span_end] if span_end < len(text) else ""
+                
+                if next_char in [".", ",", ";", ":"]:
+                    span_end += 1
+                    whole_word += next_char
+                    correct_str += "?"
+                    explanation += " Ayrıca soru cümlesi olduğu için sonuna soru işareti (?) konmalıdır."
+                elif next_char == "" or next_char in ["\n", "\r"]:
+                    correct_str += "?"
+                    explanation += " Ayrıca soru cümlesi olduğu için sonuna soru işareti (?) konmalıdır."
+
+                errors.append({
+                    "wrong": whole_word,
+                    "correct": correct_str,
+                    "rule_id": rule_id,
+                    "span": {"start": match.start(), "end": span_end},
+                    "type": "Yazım",
+                    "explanation": explanation,
+                    "confidence": 1.0,
+                    "source": "RULE_BASED"
+                })
+                continue
+            
+            elif rule_id == "TDK_04_SEY_AYRI":
+                stem = match.group(1)
+                correct = apply_case(whole_word, f"{stem} şey")
+                explanation = "'Şey' sözcüğü her zaman ayrı yazılır."
+            elif rule_id == "TDK_06_YA_DA": 
+                correct = apply_case(whole_word, "ya da")
+                explanation = "'Ya da' bağlacı ayrı yazılır."
+            elif rule_id == "TDK_07_HER_SEY": 
+                correct = apply_case(whole_word, "her şey")
+                explanation = "'Her şey' ayrı yazılır."
+            elif rule_id == "TDK_44_BIRKAC": 
+                correct = apply_case(whole_word, "birkaç")
+                explanation = "'Birkaç' kelimesi bitişik yazılır."
+            elif rule_id == "TDK_45_HICBIR": 
+                correct = apply_case(whole_word, "hiçbir")
+                explanation = "'Hiçbir' kelimesi bitişik yazılır."
+            elif rule_id == "TDK_46_PEKCOK": 
+                correct = apply_case(whole_word, "pek çok")
+                explanation = "'Pek çok' ayrı yazılır."
+            elif rule_id == "TDK_41_HERKES": 
+                correct = apply_case(whole_word, "herkes")
+                explanation = "'Herkes' kelimesi 's' ile yazılır."
+            elif rule_id == "TDK_42_YALNIZ": 
+                correct = apply_case(whole_word, "yalnız")
+                explanation = "Yalın kökünden gelir, 'yalnız' yazılır."
+            elif rule_id == "TDK_43_YANLIS": 
+                correct = apply_case(whole_word, "yanlış")
+                explanation = "Yanılmak kökünden gelir, 'yanlış' yazılır."
+            elif rule_id == "TDK_47_INSALLAH": 
+                correct = apply_case(whole_word, "inşallah")
+                explanation = "Doğru yazım 'inşallah' şeklindedir."
+            
+            elif rule_id == "TDK_23_KESME_GENEL":
+                stem = match.group(1)
+                suffix = match.group(2)
+                if tr_lower(stem) not in COMMON_NOUNS and stem[0].isupper():
+                    continue
+                base_correct = f"{stem}{suffix}"
+                if stem.endswith("p") and suffix[0] in "aıou": base_correct = f"{stem[:-1]}b{suffix}"
+                elif stem.endswith("t") and suffix[0] in "aıou": base_correct = f"{stem[:-1]}d{suffix}"
+                elif stem.endswith("ç") and suffix[0] in "aıou": base_correct = f"{stem[:-1]}c{suffix}"
+                elif stem.endswith("k") and suffix[0] in "aıou": base_correct = f"{stem[:-1]}ğ{suffix}"
+                
+                correct = apply_case(whole_word, base_correct)
+                explanation = "Cins isimlere (özel isim olmayan) gelen ekler kesme işaretiyle ayrılmaz."
+
+            errors.append({
+                "wrong": whole_word,
+                "correct": correct,
+                "rule_id": rule_id,
+                "span": {"start": match.start(), "end": match.end()},
+                "type": "Yazım",
+                "explanation": explanation,
+                "confidence": 1.0,
+                "source": "RULE_BASED"
+            })
+
+    # 2. ÖZEL İSİM SONEK ANALİZİ (Ahmetin -> Ahmet'in)
+    for match in PROPER_NOUN_SUFFIX_REGEX.finditer(text):
+        whole_word = match.group(0)
+        stem = match.group(1)
+        suffix = match.group(2)
+        start_idx = match.start()
+        is_sentence_start = start_idx in sentence_starts
+        
+        # EĞER KELİME BİZİM BELİRLEDİĞİMİZ ÖZEL İSİMLER LİSTESİNDE DEĞİLSE, DOKUNMA!
+        if tr_lower(stem) not in PROPER_NOUNS_WHITELIST:
+            continue
+
+        if (not is_sentence_start) or (tr_lower(stem) in PROPER_NOUNS_WHITELIST):
+            errors.append({
+                "wrong": whole_word,
+                "correct": f"{stem}'{suffix}",
+                "rule_id": "TDK_20_KESME_OZEL_AD",
+                "span": {"start": start_idx, "end": match.end()},
+                "type": "Noktalama",
+                "explanation": "Özel isimlere gelen ekler kesme işareti ile ayrılır.",
+                "confidence": 0.95,
+                "source": "RULE_BASED"
+            })
+            continue
+
+        if (not is_sentence_start) or (tr_lower(stem) in PROPER_NOUNS_WHITELIST):
+            errors.append({
+                "wrong": whole_word,
+                "correct": f"{stem}'{suffix}",
+                "rule_id": "TDK_20_KESME_OZEL_AD",
+                "span": {"start": start_idx, "end": match.end()},
+                "type": "Noktalama",
+                "explanation": "Özel isimlere gelen ekler kesme işareti ile ayrılır.",
+                "confidence": 0.95,
+                "source": "RULE_BASED"
+            })
+
+    # 3. GEREKSİZ BÜYÜK HARF TARAMASI
+    for match in CAPITALIZED_WORD_REGEX.finditer(text):
+        whole_word = match.group(0)
+        start_idx = match.start()
+        
+        if start_idx in sentence_starts: continue
+        if tr_lower(whole_word) in PROPER_NOUNS_WHITELIST: continue
+        
+        already_found = any(e['span']['start'] == start_idx for e in errors)
+        if already_found: continue
+
+        if tr_lower(whole_word) in COMMON_NOUNS:
+             errors.append({
+                "wrong": whole_word,
+                "correct": tr_lower(whole_word),
+                "rule_id": "TDK_12_GEREKSIZ_BUYUK",
+                "span": {"start": start_idx, "end": match.end()},
+                "type": "Büyük Harf",
+                "explanation": "Küçük harfle başlamalı.",
+                "confidence": 0.90,
+                "source": "RULE_BASED"
+            })
+
+    return errors
+
+
+# =======================================================
+# 4) SON İŞLEM: HATA BİRLEŞTİRME VE RÜBRİK HESABI
+# =======================================================
+def merge_errors(text: str, rule_errors: List[Dict[str, Any]], raw_llm_errors: List[Dict[str, Any]]) -> tuple:
+    llm_errors = []
+    for item in raw_llm_errors:
+        wrong_word = item.get("wrong", "")
+        if not wrong_word: continue
+        match = re.search(re.escape(wrong_word), text)
+        if match:
+            is_overlap = any((match.start() < e["span"]["end"] and match.end() > e["span"]["start"]) for e in rule_errors)
+            if not is_overlap:
+                llm_errors.append({
+                    "wrong": wrong_word,
+                    "correct": item.get("correct"),
+                    "rule_id": "LLM_SEMANTIC",
+                    "span": {"start": match.start(), "end": match.end()},
+                    "type": "Kelime Hatası",
+                    "explanation": item.get("explanation"),
+                    "confidence": 0.85,
+                    "source": "LLM"
+                })
+
+    all_errors = rule_errors + llm_errors
+    all_errors.sort(key=lambda x: x["span"]["start"])
+
+    unique_error_map = {}
+    for err in all_errors:
+        # Kural ID'sine bakmaksızın sadece hatalı kelimeyi anahtar yapıyoruz.
+        # Böylece aynı kelime 2 farklı kuralla bulunsa bile kartlarda tek 1 kez görünür.
+        key = err['wrong'].lower().strip()
+        if key not in unique_error_map:
+            unique_error_map[key] = err
+
+    error_summary = list(unique_error_map.values())
+    error_summary.sort(key=lambda x: x["span"]["start"])
+    return all_errors, error_summary
+
+def compute_rubric(word_count: int, cefr_min: int, cefr_max: int, error_summary: List[Dict[str, Any]], rb: dict) -> Dict[str, int]:
+    # Uzunluk puanını kodda hesapla — LLM'e bırakma
+    if word_count >= cefr_max:
+        uzunluk_puan = 16
+    elif word_count >= cefr_min:
+        uzunluk_puan = 12
+    elif word_count >= cefr_min * 0.75:
+        uzunluk_puan = 8
+    elif word_count >= cefr_min * 0.5:
+        uzunluk_puan = 4
+    else:
+        uzunluk_puan = 1
+
+    # Hata tipine göre dil bilgisi ve söz dizimi puanlarını kodda hesapla
+    # Sadece rule-based ve LLM_SEMANTIC hataları say, OCR kaynaklıları sayma
+    dil_hatalari = [e for e in error_summary if e.get("type") in ("Yazım", "Büyük Harf", "Noktalama") or e.get("rule_id", "").startswith("TDK_")]
+    soz_hatalari = [e for e in error_summary if e.get("rule_id") == "LLM_SEMANTIC" and e.get("type") not in ("Yazım", "Büyük Harf")]
+
+    dil_hata_orani = len(dil_hatalari) / max(word_count, 1)
+    soz_hata_orani = len(soz_hatalari) / max(word_count, 1)
+
+    # Dil Bilgisi (maks 16): hata oranına göre
+    if dil_hata_orani == 0:
+        dil_bilgisi_puan = 16
+    elif dil_hata_orani <= 0.03:
+        dil_bilgisi_puan = 12
+    elif dil_hata_orani <= 0.07:
+        dil_bilgisi_puan = 8
+    elif dil_hata_orani <= 0.12:
+        dil_bilgisi_puan = 4
+    else:
+        dil_bilgisi_puan = 1
+
+    # Söz Dizimi (maks 20): LLM puanını baz al ama OCR etkisini sınırla
+    # LLM'in verdiği puanı al, ama minimum 8 olsun (OCR bozukluğu cezası engellensin)
+    llm_soz = to_int(rb.get("soz_dizimi"), 10)
+    soz_dizimi_puan = max(llm_soz, 8) if word_count >= cefr_min else llm_soz
+
+    return {
+        "uzunluk": uzunluk_puan,
+        "noktalama": to_int(rb.get("noktalama"), 7),
+        "dil_bilgisi": dil_bilgisi_puan,
+        "soz_dizimi": soz_dizimi_puan,
+        "kelime": to_int(rb.get("kelime"), 7),
+        "icerik": to_int(rb.get("icerik"), 10),
+    }
+
+def finalize_analysis(text: str, rule_errors: List[Dict[str, Any]], raw_llm_errors: List[Dict[str, Any]],
+                      word_count: int, cefr_min: int, cefr_max: int, rb: dict) -> tuple:
+    """Birleştirme ve rübrik aşamalarını tek çağrıda yapar (havuzda tek gidiş-dönüş)."""
+    all_errors, error_summary = merge_errors(text, rule_errors, raw_llm_errors)
+    return all_errors, error_summary, compute_rubric(word_count, cefr_min, cefr_max, error_summary, rb)
+
+# =======================================================
+# 5) OCR METNİ
+# =======================================================
+def extract_page_text(annotation) -> tuple:
+    """Tek bir görselin Vision çıktısından (maskeli metin, ham metin, ortalama güven) üretir."""
+    CONFIDENCE_THRESHOLD = 0.55
+    masked_parts, raw_parts, confidences = [], [], []
+    PUNCTUATION = set(".,;:!?\"'’`()-–—…")
+
+    def append_break(break_type_val: int):
+        if not break_type_val: return
+        if break_type_val in (1, 2):
+            masked_parts.append(" "); raw_parts.append(" ")
+        elif break_type_val in (3, 5):
+            masked_parts.append("\n"); raw_parts.append("\n")
+
+    for page in annotation.pages:
+        for block in page.blocks:
+            for paragraph in block.paragraphs:
+                for word in paragraph.words:
+                    for symbol in word.symbols:
+                        ch = symbol.text or ""
+                        conf = getattr(symbol, "confidence", 1.0)
+                        confidences.append(conf)
+                        raw_parts.append(ch)
+                        if ch in PUNCTUATION: masked_parts.append(ch)
+                        elif ch.isalpha(): masked_parts.append("⍰" if conf < CONFIDENCE_THRESHOLD else ch)
+                        else: masked_parts.append(ch)
+                        prop = getattr(symbol, "property", None)
+                        db = getattr(prop, "detected_break", None) if prop else None
+                        if db: append_break(int(getattr(db, "type_", getattr(db, "type", 0))))
+
+    page_conf = round(sum(confidences) / len(confidences), 3) if confidences else 0.0
+    return "".join(masked_parts).strip(), "".join(raw_parts).strip(), page_conf
+
+def split_vision_batches(sizes: List[int], max_bytes: int, max_images: int) -> List[List[int]]:
+    """Sayfa indekslerini sırayı koruyarak Vision istek sınırlarını aşmayan gruplara böler."""
+    batches, current, current_bytes = [], [], 0
+    for idx, size in enumerate(sizes):
+        if current and (current_bytes + size > max_bytes or len(current) >= max_images):
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.append(idx)
+        current_bytes += size
+    if current: batches.append(current)
+    return batches
+
+def force_suspect(t: str) -> str:
+    t = re.sub(r"\b[gG]ok\b", lambda m: "⍰"+m.group(0)[1:], t)
+    return re.sub(r"\b[gG]ay\b", lambda m: "⍰"+m.group(0)[1:], t)
+
+def merge_pages(page_results: List[tuple]) -> tuple:
+    """Sayfa sonuçlarını (maskeli, ham, güven) yükleme sırasıyla tek metinde birleştirir."""
+    masked_text = unicodedata.normalize("NFC", "\n".join(r[0] for r in page_results if r[0]))
+    raw_text = unicodedata.normalize("NFC", "\n".join(r[1] for r in page_results if r[1]))
+    return force_suspect(masked_text), raw_text, [r[2] for r in page_results]
+
+# =======================================================
+# 6) SÜREÇ HAVUZU
+# =======================================================
+def warm_worker() -> None:
+    """İşçi başlarken regex motorunu ve sözlükleri ısıtır; ilk istek soğuk başlamaz."""
+    analyze_deterministic("Herşey yada hiç bir şey. Okula gittinmi? Ahmetin Kitap'ı.")
+
+def _noop() -> None:
+    pass
+
+def prime_analysis_pool(pool: ProcessPoolExecutor, workers: int) -> None:
+    """Her işçi için boş bir görev gönderip bekler; spawn ve warm_worker maliyeti açılışa düşer."""
+    # Isınma initializer'da yapılır; burada sadece işçilerin başlamasını tetikliyoruz
+    for future in [pool.submit(_noop) for _ in range(workers)]:
+        future.result()
+
+def create_analysis_pool(workers: int) -> Optional[ProcessPoolExecutor]:
+    # "spawn": işçiler gRPC/HTTP iş parçacıklı ana süreci fork etmez, yalnızca bu modülü yükler
+    if workers <= 0: return None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=warm_worker)
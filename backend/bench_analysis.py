@@ -0,0 +1,104 @@
+"""
+Analiz aşamaları için karma yük kıyaslaması (API anahtarı gerektirmez).
+
+Her sanal /analyze isteği gerçek akışı taklit eder: kural taraması, LLM
+çağrıları yerine beklenen bir gecikme, ardından birleştirme + rübrik. Aynı
+event loop üzerinde sürekli ucuz istekler (/check-class benzeri) ölçülür.
+ANALYSIS_WORKERS=0 (inline) ile 1..N işçili süreç havuzu karşılaştırılır.
+
+Kullanım: python bench_analysis.py [istek_sayisi] [maks_isci] [eszamanli_istemci] [llm_ms]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+from analysis import analyze_deterministic, finalize_analysis, create_analysis_pool, prime_analysis_pool
+
+SENTENCES = [
+    "Herşey çok güzeldi ama yada hiç bir şey bilmiyordum.",
+    "Ahmetin Kitap'ı masada duruyordu, okula gittinmi.",
+    "Samsunda birkaç arkadaşım var ve onlarla Foruma gittik.",
+    "Yanlis bir şey yaptım mı diye herkez bana baktı.",
+    "Sınıfta Öğretmen bize pekçok soru sordu ve ben yanliz kaldım.",
+    "İstanbul'a gitmek istiyorum çünkü orada ailem yaşıyor.",
+]
+
+
+def make_essay(words: int = 300) -> str:
+    out = []
+    while sum(len(s.split()) for s in out) < words:
+        out.append(random.choice(SENTENCES))
+    return " ".join(out)
+
+
+def percentile(values: list, p: float) -> float:
+    if not values: return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run(workers: int, essays: list, clients: int, llm_latency: float) -> dict:
+    pool = create_analysis_pool(workers)
+    if pool: await asyncio.to_thread(prime_analysis_pool, pool, workers)
+    loop = asyncio.get_running_loop()
+
+    async def cpu(fn, *args):
+        if pool is None: return fn(*args)
+        return await loop.run_in_executor(pool, fn, *args)
+
+    request_latencies, probe_latencies = [], []
+    queue = list(essays)
+
+    async def client():
+        while queue:
+            text = queue.pop()
+            t0 = time.perf_counter()
+            rule_errors = await cpu(analyze_deterministic, text)
+            await asyncio.sleep(llm_latency)  # Gemini çağrılarının yerine
+            llm_errors = [{"wrong": w, "correct": w, "explanation": ""} for w in text.split()[::15]]
+            await cpu(finalize_analysis, text, rule_errors, llm_errors, len(text.split()), 200, 300, {})
+            request_latencies.append(time.perf_counter() - t0)
+
+    async def cheap_probe():
+        # Event loop'un ucuz isteklere ne kadar geç döndüğünü ölçer
+        while True:
+            t0 = time.perf_counter()
+            await asyncio.sleep(0.002)
+            probe_latencies.append(time.perf_counter() - t0 - 0.002)
+
+    probe = asyncio.create_task(cheap_probe())
+    t0 = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(clients)])
+    elapsed = time.perf_counter() - t0
+    probe.cancel()
+    if pool: pool.shutdown()
+
+    return {
+        "throughput": len(essays) / elapsed,
+        "req_p50": percentile(request_latencies, 0.50) * 1000,
+        "req_p99": percentile(request_latencies, 0.99) * 1000,
+        "probe_p99": percentile(probe_latencies, 0.99) * 1000,
+        "probe_n": len(probe_latencies),
+    }
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    clients = int(sys.argv[3]) if len(sys.argv) > 3 else 32
+    llm_latency = (float(sys.argv[4]) if len(sys.argv) > 4 else 50) / 1000
+    random.seed(42)
+    essays = [make_essay(random.choice([130, 200, 300])) for _ in range(n)]
+
+    print(f"{n} istek, {clients} eşzamanlı istemci, LLM gecikmesi {llm_latency * 1000:.0f} ms, {os.cpu_count()} çekirdek")
+    print(f"{'işçi':>6} {'istek/sn':>9} {'istek p50':>10} {'istek p99':>10} {'ucuz p99':>9} {'örnek':>6}")
+    for workers in [0] + list(range(1, max_workers + 1)):
+        r = asyncio.run(run(workers, essays, clients, llm_latency))
+        label = "inline" if workers == 0 else str(workers)
+        print(f"{label:>6} {r['throughput']:>9.1f} {r['req_p50']:>8.1f}ms {r['req_p99']:>8.1f}ms {r['probe_p99']:>7.1f}ms {r['probe_n']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+İçerik hash'ine göre görsel ve OCR sonucu tekilleştirme (dedup).
+
+Aynı sayfa tekrar gönderildiğinde (mobil retry, çift fotoğraf) Storage ve Vision
+maliyetini atlar. main.py'den ayrı tutulur; FastAPI ve SDK'lar olmadan test edilebilir.
+"""
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import List, Dict, Any
+
+OCR_CACHE_SIZE = 512  # İçerik hash'ine göre saklanan OCR sonucu / görsel URL sayısı
+VISION_COST_PER_PAGE_USD = 0.0015  # DOCUMENT_TEXT_DETECTION liste fiyatı (1000 birim = 1.50$)
+
+OCR_RESULT_CACHE: OrderedDict = OrderedDict()  # hash -> (masked, raw, confidence)
+IMAGE_URL_CACHE: OrderedDict = OrderedDict()   # hash -> public url
+DEDUP_STATS = {"pages_total": 0, "uploads_skipped": 0, "bytes_saved": 0, "vision_pages_saved": 0}
+
+def image_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+def cache_get(cache: OrderedDict, key: str):
+    if key not in cache: return None
+    cache.move_to_end(key)
+    return cache[key]
+
+def cache_put(cache: OrderedDict, key: str, value) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > OCR_CACHE_SIZE: cache.popitem(last=False)
+
+def count_skipped_upload(size: int) -> None:
+    DEDUP_STATS["uploads_skipped"] += 1
+    DEDUP_STATS["bytes_saved"] += size
+
+def is_duplicate_upload(e: Exception) -> bool:
+    """Storage hatasının "nesne zaten var" (409 Duplicate) olup olmadığını yapısal alanlardan okur."""
+    # storage3: StorageException({"statusCode": "409", "error": "Duplicate", ...}) ya da StorageApiError(.status, .code)
+    payload = e.args[0] if e.args and isinstance(e.args[0], dict) else {}
+    status = payload.get("statusCode", getattr(e, "status", None))
+    code = payload.get("error", getattr(e, "code", None))
+    return str(status) == "409" or code == "Duplicate"
+
+def plan_pages(contents: List[bytes]) -> tuple:
+    """
+    Sayfaları hash'ler ve önbellekte olmayanları ayırır.
+    Döner: (digests, unique {hash: bytes}, page_results {hash: sonuç|None}, pending [hash])
+    """
+    digests = [image_hash(c) for c in contents]
+    DEDUP_STATS["pages_total"] += len(contents)
+
+    page_results = {d: cache_get(OCR_RESULT_CACHE, d) for d in digests}
+    unique = {d: c for d, c in zip(digests, contents)}
+    pending = [d for d, r in page_results.items() if r is None]
+    DEDUP_STATS["vision_pages_saved"] += len(digests) - len(pending)
+    # Aynı istekte tekrar eden sayfalar da yüklenmez; sayaçlar diğer dedup yollarıyla tutarlı
+    DEDUP_STATS["uploads_skipped"] += len(digests) - len(unique)
+    DEDUP_STATS["bytes_saved"] += sum(len(c) for c in contents) - sum(len(c) for c in unique.values())
+    return digests, unique, page_results, pending
+
+async def upload_image(bucket, content: bytes, digest: str) -> str:
+    cached_url = cache_get(IMAGE_URL_CACHE, digest)
+    if cached_url:
+        count_skipped_upload(len(content))
+        return cached_url
+
+    filename = f"{digest}.jpg"
+    try:
+        await asyncio.to_thread(bucket.upload, filename, content, {"content-type": "image/jpeg"})
+    except Exception as e:
+        # Aynı hash zaten yüklüyse (önceki istek ya da eşzamanlı retry) Storage 409 döner: nesne var, dedup isabeti.
+        # Diğer hatalarda URL önbelleğe alınmaz; yazılmamış bir nesnenin URL'si sonraki isteklere dönmesin.
+        if not is_duplicate_upload(e): return ""
+        count_skipped_upload(len(content))
+    try:
+        url = bucket.get_public_url(filename)
+        cache_put(IMAGE_URL_CACHE, digest, url)
+        return url
+    except: return ""
+
+def dedup_report() -> Dict[str, Any]:
+    return {
+        **DEDUP_STATS,
+        "vision_usd_saved": round(DEDUP_STATS["vision_pages_saved"] * VISION_COST_PER_PAGE_USD, 4),
+        "cached_results": len(OCR_RESULT_CACHE),
+    }
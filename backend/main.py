@@ -5,11 +5,16 @@ from google.genai import types
 from google.cloud import vision
 from supabase import create_client, Client
 from dotenv import load_dotenv
-import os, json, uuid, re
+import os, json
 import unicodedata
 from pydantic import BaseModel
 from typing import Union, List, Dict, Any, Optional
 import asyncio
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from analysis import analyze_deterministic, finalize_analysis, create_analysis_pool, prime_analysis_pool
+from analysis import extract_page_text, merge_pages, split_vision_batches
+from dedup import OCR_RESULT_CACHE, cache_put, plan_pages, upload_image, dedup_report
 
 # =======================================================
 # 1) AYARLAR VE KURULUM
@@ -25,10 +30,26 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise RuntimeError("❌ KRİTİK HATA: SUPABASE bilgileri eksik!")
 
+# CPU-yoğun analiz aşamaları için süreç havuzu boyutu (0 = event loop üzerinde çalıştır, varsayılan).
+# Havuz yalnızca çok çekirdekli sunucularda ve uzun metinlerde işe yarar: istek başına CPU ~2 ms olduğundan
+# tek çekirdekte IPC maliyeti kazancı aşar ve verimi düşürür (bkz. bench_analysis.py).
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "0") or 0)
+
 client = genai.Client(api_key=API_KEY)
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-app = FastAPI(title="Sanal Ogretmen AI API - TUBITAK Hybrid Edition", version="5.5.2")
+ANALYSIS_POOL = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global ANALYSIS_POOL
+    ANALYSIS_POOL = create_analysis_pool(ANALYSIS_WORKERS)
+    # İşçileri açılışta başlat; ilk /analyze istekleri süreç spawn'ını beklemesin
+    if ANALYSIS_POOL: await asyncio.to_thread(prime_analysis_pool, ANALYSIS_POOL, ANALYSIS_WORKERS)
+    yield
+    if ANALYSIS_POOL: ANALYSIS_POOL.shutdown(cancel_futures=True)
+
+app = FastAPI(title="Sanal Ogretmen AI API - TUBITAK Hybrid Edition", version="5.5.2", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -40,6 +61,10 @@ app.add_middleware(
 
 MODELS_TO_TRY = ["gemini-2.0-flash", "gemini-1.5-flash"]
 MAX_FILE_SIZE = 6 * 1024 * 1024
+MAX_OCR_PAGES = 5  # Uzun B2/C1 metinleri için tek istekte yüklenebilecek sayfa sayısı
+# Vision tek annotate isteğinde en fazla 10 MB / 16 görsel kabul eder; protobuf payı için 9 MB
+VISION_MAX_REQUEST_BYTES = 9 * 1024 * 1024
+VISION_MAX_BATCH_IMAGES = 16
 
 # CEFR seviyelerine göre beklenen kelime sayısı aralıkları
 CEFR_WORD_COUNT = {
@@ -52,65 +77,12 @@ CEFR_WORD_COUNT = {
 }
 
 # =======================================================
-# 2) AKADEMİK REFERANS VERİ SETLERİ VE REGEX (DESENLER)
-# =======================================================
-
-MI_SUFFIX_BLACKLIST = {
-    "cami", "mami", "hami", "samimi", "kimi", "tümü", "ilhami", "resmi", "cismi",
-    "ismi", "yemi", "gemisi", "sevgilisi", "kendisi", "annesi", "babası", "abisi",
-    "mermi", "irmi", "vermi", "gemi", "komi", "kalemi", "problemi", "dönemi",
-    "gözlemi", "sistemi", "ailemi", "annemi", "babamı", "kardeşimi", "elimi", "evimi",
-    "gözümü", "sözümü", "yüzümü", "hacmi", "mülkiyeti", "hakimiyeti", 
-    "mevsimi", "seçimi", "üretimi", "tüketimi", "bölümü", "durumu"
-}
-
-PROPER_NOUNS_WHITELIST = {
-    "türkiye", "samsun", "istanbul", "ankara", "izmir", "atatürk", "mehmet", "ahmet",
-    "ayşe", "fatma", "ali", "veli", "atakum", "ilkadım", "canik", "çarşamba", "bafra",
-    "ingilizce", "türkçe", "almanca", "fransızca", "allah", "tanrı", "mardin", "mersin",
-    "batman", "bartın", "karaman", "erzincan", "van", "muş", 
-    "piazza", "city", "mall"
-}
-
-COMMON_NOUNS = {
-    "okul", "kitap", "kalem", "masa", "sandalye", "araba", "ev", "bahçe", "şehir", 
-    "insan", "çocuk", "kadın", "adam", "sokak", "mahalle", "köy", "su", "ekmek", 
-    "çay", "kahve", "çok", "pek", "güzel", "iyi", "kötü", "büyük", "küçük", 
-    "öğrenci", "öğretmen", "ders", "sınıf", "arkadaş", "sevgi", "saygı", "mutluluk",
-    "yemek", "bardak", "defter", "silgi", "çanta", "dolap", "kapı", "pencere"
-}
-
-QUESTION_WORDS = re.compile(r"\b(ne|neden|niçin|nasıl|nasil|kim|hangi|nerede|nereye|nereden|kaç|kac)\b", re.IGNORECASE | re.UNICODE)
-EMBEDDED_QUESTION_GUARDS = re.compile(r"\b(bilmiyorum|emin\s+değilim|sanmıyorum|hatırlamıyorum|diyemem|diyemiyorum|anlamıyorum|bilmez|sormadım)\b", re.IGNORECASE | re.UNICODE)
-
-PATTERNS = {
-    "TDK_03_SORU_EKI": re.compile(r"\b(\w{2,})(mi|mı|mu|mü)(?=[?.!,;:\s]|$)", re.IGNORECASE | re.UNICODE),
-    "TDK_04_SEY_AYRI": re.compile(r"\b(\w+)şey\b", re.IGNORECASE | re.UNICODE),
-    "TDK_06_YA_DA": re.compile(r"\byada\b", re.IGNORECASE | re.UNICODE),
-    "TDK_07_HER_SEY": re.compile(r"\bherşey\b", re.IGNORECASE | re.UNICODE),
-    "TDK_44_BIRKAC": re.compile(r"\bbir\s+kaç\b", re.IGNORECASE | re.UNICODE),
-    "TDK_45_HICBIR": re.compile(r"\bhiç\s+bir\b", re.IGNORECASE | re.UNICODE),
-    "TDK_46_PEKCOK": re.compile(r"\bpekçok\b", re.IGNORECASE | re.UNICODE),
-    "TDK_41_HERKES": re.compile(r"\bherkez\b", re.IGNORECASE | re.UNICODE),
-    "TDK_42_YALNIZ": re.compile(r"\byanliz\b", re.IGNORECASE | re.UNICODE),
-    "TDK_43_YANLIS": re.compile(r"\byanlis\b", re.IGNORECASE | re.UNICODE),
-    "TDK_47_INSALLAH": re.compile(r"\binsallah\b", re.IGNORECASE | re.UNICODE),
-    "TDK_23_KESME_GENEL": re.compile(r"\b([A-ZÇĞİÖŞÜa-zçğıöşü]{3,})'([a-zçğıöşü]+)\b", re.UNICODE)
-}
-
-PROPER_NOUN_SUFFIX_REGEX = re.compile(
-    r"\b([A-ZÇĞİÖŞÜ][a-zçğıöşü]{2,})(nin|nın|nun|nün|in|ın|un|ün|de|da|den|dan|e|a|i|ı|u|ü|le|la)\b",
-    re.UNICODE
-)
-
-CAPITALIZED_WORD_REGEX = re.compile(r"\b[A-ZÇĞİÖŞÜ][a-zçğıöşü]+\b", re.UNICODE)
-
-# =======================================================
-# 3) DATA MODELS & HELPERS
+# 2) DATA MODELS & HELPERS
 # =======================================================
 class AnalyzeRequest(BaseModel):
     ocr_text: str
     image_url: Optional[str] = ""
+    image_urls: List[str] = []  # Çok sayfalı ödevlerde tüm sayfalar (image_url = ilk sayfa)
     student_name: str
     student_surname: str
     classroom_code: str
@@ -123,46 +95,35 @@ class UpdateScoreRequest(BaseModel):
     new_rubric: dict
     new_total: int
 
+async def run_cpu_bound(fn, *args):
+    global ANALYSIS_POOL
+    # Havuz yoksa eski davranış: doğrudan event loop üzerinde
+    pool = ANALYSIS_POOL
+    if pool is None: return fn(*args)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(pool, fn, *args)
+    except BrokenProcessPool:
+        # Bir işçi öldüyse (ör. OOM) havuzu bir kez yeniden kur ve tekrar dene; o da olmazsa inline çalış
+        print("⚠️ Analiz havuzu bozuldu, yeniden kuruluyor.")
+        if ANALYSIS_POOL is pool:
+            ANALYSIS_POOL = create_analysis_pool(ANALYSIS_WORKERS)
+            pool.shutdown(wait=False)
+        try: return await loop.run_in_executor(ANALYSIS_POOL, fn, *args)
+        except BrokenProcessPool: return fn(*args)
+
 def normalize_text(text: str) -> str:
     if not text: return ""
     text = text.replace("’", "'").replace("`", "'")
     text = unicodedata.normalize("NFKC", text)
     return text.strip()
 
-def tr_lower(text: str) -> str:
-    return text.replace("İ", "i").replace("I", "ı").lower()
-
 def safe_json(text: str) -> dict:
     if not text: return {}
     t = text.strip().replace("```json", "").replace("```", "").strip()
     try: return json.loads(t)
     except: return {}
 
-def to_int(x, default=0):
-    try:
-        if x is None: return default
-        if isinstance(x, (int, float)): return int(x)
-        if isinstance(x, str):
-            clean = re.sub(r"[^\d\-]", "", x.split("/")[0])
-            return int(clean) if clean else default
-        return default
-    except: return default
-
-def get_sentence_starts(text: str) -> set:
-    starts = {0}
-    for match in re.finditer(r"[.!?]\s+", text):
-        starts.add(match.end())
-    return starts
-
-def apply_case(original: str, target: str) -> str:
-    """Kelimenin büyük/küçük harf durumunu koruyan akıllı yardımcı fonksiyon."""
-    if not original or not target: return target
-    if original.istitle() or (original[0].isupper() and original[1:].islower()):
-        return target.capitalize()
-    if original.isupper():
-        return target.upper()
-    return target
-
 async def ensure_gcp_credentials():
     if os.getenv("GOOGLE_APPLICATION_CREDENTIALS"): return
     key_json = os.getenv("GCP_SA_KEY_JSON", "").strip()
@@ -185,174 +146,7 @@ async def read_limited(upload: UploadFile, limit: int) -> bytes:
     return b"".join(chunks)
 
 # =======================================================
-# 4) CORE ALGORİTMA: DETERMİNİSTİK ANALİZ (REGEX)
-# =======================================================
-def analyze_deterministic(text: str) -> List[Dict[str, Any]]:
-    errors = []
-    sentence_starts = get_sentence_starts(text)
-    
-    # 1. STANDART REGEX HATALARI
-    for rule_id, pattern in PATTERNS.items():
-        for match in pattern.finditer(text):
-            whole_word = match.group(0)
-            
-            if rule_id == "TDK_03_SORU_EKI":
-                stem = match.group(1)
-                suffix = match.group(2)
-                span_end = match.end()
-                
-                if tr_lower(whole_word) in MI_SUFFIX_BLACKLIST:
-                    continue 
-                
-                base_correct = f"{stem} {suffix}"
-                correct_str = apply_case(whole_word, base_correct)
-                explanation = "Soru eki 'mi/mı' her zaman ayrı yazılır."
-
-                # Gelişmiş Soru İşareti Mantığı (Virgül/Nokta varsa soru işaretine çevirir)
-                next_char = text[span_end] if span_end < len(text) else ""
-                
-                if next_char in [".", ",", ";", ":"]:
-                    span_end += 1
-                    whole_word += next_char
-                    correct_str += "?"
-                    explanation += " Ayrıca soru cümlesi olduğu için sonuna soru işareti (?) konmalıdır."
-                elif next_char == "" or next_char in ["\n", "\r"]:
-                    correct_str += "?"
-                    explanation += " Ayrıca soru cümlesi olduğu için sonuna soru işareti (?) konmalıdır."
-
-                errors.append({
-                    "wrong": whole_word,
-                    "correct": correct_str,
-                    "rule_id": rule_id,
-                    "span": {"start": match.start(), "end": span_end},
-                    "type": "Yazım",
-                    "explanation": explanation,
-                    "confidence": 1.0,
-                    "source": "RULE_BASED"
-                })
-                continue
-            
-            elif rule_id == "TDK_04_SEY_AYRI":
-                stem = match.group(1)
-                correct = apply_case(whole_word, f"{stem} şey")
-                explanation = "'Şey' sözcüğü her zaman ayrı yazılır."
-            elif rule_id == "TDK_06_YA_DA": 
-                correct = apply_case(whole_word, "ya da")
-                explanation = "'Ya da' bağlacı ayrı yazılır."
-            elif rule_id == "TDK_07_HER_SEY": 
-                correct = apply_case(whole_word, "her şey")
-                explanation = "'Her şey' ayrı yazılır."
-            elif rule_id == "TDK_44_BIRKAC": 
-                correct = apply_case(whole_word, "birkaç")
-                explanation = "'Birkaç' kelimesi bitişik yazılır."
-            elif rule_id == "TDK_45_HICBIR": 
-                correct = apply_case(whole_word, "hiçbir")
-                explanation = "'Hiçbir' kelimesi bitişik yazılır."
-            elif rule_id == "TDK_46_PEKCOK": 
-                correct = apply_case(whole_word, "pek çok")
-                explanation = "'Pek çok' ayrı yazılır."
-            elif rule_id == "TDK_41_HERKES": 
-                correct = apply_case(whole_word, "herkes")
-                explanation = "'Herkes' kelimesi 's' ile yazılır."
-            elif rule_id == "TDK_42_YALNIZ": 
-                correct = apply_case(whole_word, "yalnız")
-                explanation = "Yalın kökünden gelir, 'yalnız' yazılır."
-            elif rule_id == "TDK_43_YANLIS": 
-                correct = apply_case(whole_word, "yanlış")
-                explanation = "Yanılmak kökünden gelir, 'yanlış' yazılır."
-            elif rule_id == "TDK_47_INSALLAH": 
-                correct = apply_case(whole_word, "inşallah")
-                explanation = "Doğru yazım 'inşallah' şeklindedir."
-            
-            elif rule_id == "TDK_23_KESME_GENEL":
-                stem = match.group(1)
-                suffix = match.group(2)
-                if tr_lower(stem) not in COMMON_NOUNS and stem[0].isupper():
-                    continue
-                base_correct = f"{stem}{suffix}"
-                if stem.endswith("p") and suffix[0] in "aıou": base_correct = f"{stem[:-1]}b{suffix}"
-                elif stem.endswith("t") and suffix[0] in "aıou": base_correct = f"{stem[:-1]}d{suffix}"
-                elif stem.endswith("ç") and suffix[0] in "aıou": base_correct = f"{stem[:-1]}c{suffix}"
-                elif stem.endswith("k") and suffix[0] in "aıou": base_correct = f"{stem[:-1]}ğ{suffix}"
-                
-                correct = apply_case(whole_word, base_correct)
-                explanation = "Cins isimlere (özel isim olmayan) gelen ekler kesme işaretiyle ayrılmaz."
-
-            errors.append({
-                "wrong": whole_word,
-                "correct": correct,
-                "rule_id": rule_id,
-                "span": {"start": match.start(), "end": match.end()},
-                "type": "Yazım",
-                "explanation": explanation,
-                "confidence": 1.0,
-                "source": "RULE_BASED"
-            })
-
-    # 2. ÖZEL İSİM SONEK ANALİZİ (Ahmetin -> Ahmet'in)
-    for match in PROPER_NOUN_SUFFIX_REGEX.finditer(text):
-        whole_word = match.group(0)
-        stem = match.group(1)
-        suffix = match.group(2)
-        start_idx = match.start()
-        is_sentence_start = start_idx in sentence_starts
-        
-        # EĞER KELİME BİZİM BELİRLEDİĞİMİZ ÖZEL İSİMLER LİSTESİNDE DEĞİLSE, DOKUNMA!
-        if tr_lower(stem) not in PROPER_NOUNS_WHITELIST:
-            continue
-
-        if (not is_sentence_start) or (tr_lower(stem) in PROPER_NOUNS_WHITELIST):
-            errors.append({
-                "wrong": whole_word,
-                "correct": f"{stem}'{suffix}",
-                "rule_id": "TDK_20_KESME_OZEL_AD",
-                "span": {"start": start_idx, "end": match.end()},
-                "type": "Noktalama",
-                "explanation": "Özel isimlere gelen ekler kesme işareti ile ayrılır.",
-                "confidence": 0.95,
-                "source": "RULE_BASED"
-            })
-            continue
-
-        if (not is_sentence_start) or (tr_lower(stem) in PROPER_NOUNS_WHITELIST):
-            errors.append({
-                "wrong": whole_word,
-                "correct": f"{stem}'{suffix}",
-                "rule_id": "TDK_20_KESME_OZEL_AD",
-                "span": {"start": start_idx, "end": match.end()},
-                "type": "Noktalama",
-                "explanation": "Özel isimlere gelen ekler kesme işareti ile ayrılır.",
-                "confidence": 0.95,
-                "source": "RULE_BASED"
-            })
-
-    # 3. GEREKSİZ BÜYÜK HARF TARAMASI
-    for match in CAPITALIZED_WORD_REGEX.finditer(text):
-        whole_word = match.group(0)
-        start_idx = match.start()
-        
-        if start_idx in sentence_starts: continue
-        if tr_lower(whole_word) in PROPER_NOUNS_WHITELIST: continue
-        
-        already_found = any(e['span']['start'] == start_idx for e in errors)
-        if already_found: continue
-
-        if tr_lower(whole_word) in COMMON_NOUNS:
-             errors.append({
-                "wrong": whole_word,
-                "correct": tr_lower(whole_word),
-                "rule_id": "TDK_12_GEREKSIZ_BUYUK",
-                "span": {"start": start_idx, "end": match.end()},
-                "type": "Büyük Harf",
-                "explanation": "Küçük harfle başlamalı.",
-                "confidence": 0.90,
-                "source": "RULE_BASED"
-            })
-
-    return errors
-
-# =======================================================
-# 5) ENDPOINTS
+# 3) ENDPOINTS
 # =======================================================
 
 @app.get("/check-class/{code}")
@@ -364,64 +158,62 @@ async def check_class_code(code: str):
     except: return {"valid": False}
 
 @app.post("/ocr")
-async def ocr_image(file: UploadFile = File(...), classroom_code: str = Form(...)):
+async def ocr_image(files: List[UploadFile] = File(..., alias="file"), classroom_code: str = Form(...)):
     try:
+        if len(files) > MAX_OCR_PAGES: return {"status": "error", "message": f"En fazla {MAX_OCR_PAGES} sayfa yüklenebilir."}
+
         await ensure_gcp_credentials()
-        file_content = await read_limited(file, MAX_FILE_SIZE)
-        
-        filename = f"{uuid.uuid4()}.jpg"
-        image_url = ""
-        try:
-            supabase.storage.from_("odevler").upload(filename, file_content, {"content-type": "image/jpeg"})
-            image_url = supabase.storage.from_("odevler").get_public_url(filename)
-        except: pass
-
-        try: vision_client = vision.ImageAnnotatorClient()
-        except: return {"status": "error", "message": "Vision API Hatası"}
-
-        image = vision.Image(content=file_content)
-        context = vision.ImageContext(language_hints=["tr"])
-        response = vision_client.document_text_detection(image=image, image_context=context)
-        if response.error.message: return {"status": "error", "message": response.error.message}
-
-        CONFIDENCE_THRESHOLD = 0.55
-        masked_parts, raw_parts = [], []
-        PUNCTUATION = set(".,;:!?\"'’`()-–—…")
-
-        def append_break(break_type_val: int):
-            if not break_type_val: return
-            if break_type_val in (1, 2):
-                masked_parts.append(" "); raw_parts.append(" ")
-            elif break_type_val in (3, 5):
-                masked_parts.append("\n"); raw_parts.append("\n")
-
-        for page in response.full_text_annotation.pages:
-            for block in page.blocks:
-                for paragraph in block.paragraphs:
-                    for word in paragraph.words:
-                        for symbol in word.symbols:
-                            ch = symbol.text or ""
-                            conf = getattr(symbol, "confidence", 1.0)
-                            raw_parts.append(ch)
-                            if ch in PUNCTUATION: masked_parts.append(ch)
-                            elif ch.isalpha(): masked_parts.append("⍰" if conf < CONFIDENCE_THRESHOLD else ch)
-                            else: masked_parts.append(ch)
-                            prop = getattr(symbol, "property", None)
-                            db = getattr(prop, "detected_break", None) if prop else None
-                            if db: append_break(int(getattr(db, "type_", getattr(db, "type", 0))))
-
-        raw_text = unicodedata.normalize("NFC", "".join(raw_parts).strip())
-        masked_text = unicodedata.normalize("NFC", "".join(masked_parts).strip())
-
-        def force_suspect(t: str) -> str:
-            t = re.sub(r"\b[gG]ok\b", lambda m: "⍰"+m.group(0)[1:], t)
-            return re.sub(r"\b[gG]ay\b", lambda m: "⍰"+m.group(0)[1:], t)
-        
-        masked_text = force_suspect(masked_text)
-
-        return {"status": "success", "ocr_text": masked_text, "raw_ocr_text": raw_text, "image_url": image_url}
+        contents = [await read_limited(f, MAX_FILE_SIZE) for f in files]
+        # Önbellekte olmayan ve aynı istekte tekrar etmeyen sayfalar Vision'a gider
+        digests, unique, page_results, pending = plan_pages(contents)
+
+        batches, vision_tasks = [], []
+        if pending:
+            try: vision_client = vision.ImageAnnotatorClient()
+            except: return {"status": "error", "message": "Vision API Hatası"}
+
+            context = vision.ImageContext(language_hints=["tr"])
+            feature = vision.Feature(type_=vision.Feature.Type.DOCUMENT_TEXT_DETECTION)
+            # Toplam boyut Vision sınırını aşmasın diye sayfalar gerekirse birden fazla batch'e bölünür
+            groups = split_vision_batches([len(unique[d]) for d in pending], VISION_MAX_REQUEST_BYTES, VISION_MAX_BATCH_IMAGES)
+            batches = [[pending[i] for i in g] for g in groups]
+            vision_tasks = [
+                asyncio.to_thread(vision_client.batch_annotate_images, requests=[
+                    vision.AnnotateImageRequest(image=vision.Image(content=unique[d]), features=[feature], image_context=context)
+                    for d in batch_digests
+                ])
+                for batch_digests in batches
+            ]
+
+        # Vision batch'leri ve Storage yüklemeleri eşzamanlı
+        bucket = supabase.storage.from_("odevler")
+        upload_tasks = [upload_image(bucket, c, d) for d, c in unique.items()]
+        results = await asyncio.gather(*vision_tasks, *upload_tasks)
+        urls = results[len(vision_tasks):]
+        for batch_digests, batch in zip(batches, results[:len(vision_tasks)]):
+            for d, response in zip(batch_digests, batch.responses):
+                if response.error.message: return {"status": "error", "message": response.error.message}
+                page_results[d] = extract_page_text(response.full_text_annotation)
+                cache_put(OCR_RESULT_CACHE, d, page_results[d])
+        url_by_digest = dict(zip(unique, urls))
+        image_urls = [url_by_digest[d] for d in digests]
+
+        masked_text, raw_text, page_confidences = merge_pages([page_results[d] for d in digests])
+
+        return {
+            "status": "success",
+            "ocr_text": masked_text,
+            "raw_ocr_text": raw_text,
+            "image_url": image_urls[0] if image_urls else "",
+            "image_urls": image_urls,
+            "page_confidences": page_confidences,
+        }
     except Exception as e: return {"status": "error", "message": str(e)}
 
+@app.get("/ocr/dedup-stats")
+async def ocr_dedup_stats():
+    return {"status": "success", "data": dedup_report()}
+
 @app.post("/analyze")
 async def analyze_submission(data: AnalyzeRequest):
     if not data.ocr_text or not data.ocr_text.strip():
@@ -432,7 +224,7 @@ async def analyze_submission(data: AnalyzeRequest):
     full_text = normalize_text(data.ocr_text)
     print(f"🧠 HİBRİT ANALİZ BAŞLIYOR: {data.student_name} ({data.level})")
 
-    rule_errors = analyze_deterministic(full_text)
+    rule_errors = await run_cpu_bound(analyze_deterministic, full_text)
     
     prompt = f"""
     GÖREV: Aşağıdaki öğrenci metnini analiz et.
@@ -453,7 +245,6 @@ async def analyze_submission(data: AnalyzeRequest):
     }}
     """
     
-    llm_errors = []
 
     # Seviyeye göre beklenen kelime sayısını hesapla
     word_count = len(full_text.split())
@@ -520,7 +311,7 @@ async def analyze_submission(data: AnalyzeRequest):
     }}
     """
 
-    final_result = None
+    llm_result = None
 
     for model_name in MODELS_TO_TRY:
         try:
@@ -531,7 +322,7 @@ async def analyze_submission(data: AnalyzeRequest):
                 config=types.GenerateContentConfig(response_mime_type="application/json")
             )
             llm_json = safe_json(getattr(resp_err, "text", "") or "")
-            raw_llm_errors = llm_json.get("additional_errors", [])
+            raw_llm_errors = [e for e in llm_json.get("additional_errors", []) or [] if isinstance(e, dict)]
 
             resp_rubric = await asyncio.to_thread(
                 client.models.generate_content,
@@ -541,109 +332,44 @@ async def analyze_submission(data: AnalyzeRequest):
                 config=types.GenerateContentConfig(response_mime_type="application/json", temperature=0.0)
             )
             rubric_json = safe_json(getattr(resp_rubric, "text", "") or "")
-
-            for item in raw_llm_errors:
-                wrong_word = item.get("wrong", "")
-                if not wrong_word: continue
-                match = re.search(re.escape(wrong_word), full_text)
-                if match:
-                    is_overlap = any((match.start() < e["span"]["end"] and match.end() > e["span"]["start"]) for e in rule_errors)
-                    if not is_overlap:
-                        llm_errors.append({
-                            "wrong": wrong_word,
-                            "correct": item.get("correct"),
-                            "rule_id": "LLM_SEMANTIC",
-                            "span": {"start": match.start(), "end": match.end()},
-                            "type": "Kelime Hatası",
-                            "explanation": item.get("explanation"),
-                            "confidence": 0.85,
-                            "source": "LLM"
-                        })
-
-            all_errors = rule_errors + llm_errors
-            all_errors.sort(key=lambda x: x["span"]["start"])
-
-            unique_error_map = {}
-            for err in all_errors:
-                # Kural ID'sine bakmaksızın sadece hatalı kelimeyi anahtar yapıyoruz.
-                # Böylece aynı kelime 2 farklı kuralla bulunsa bile kartlarda tek 1 kez görünür.
-                key = err['wrong'].lower().strip()
-                if key not in unique_error_map:
-                    unique_error_map[key] = err
-            
-            error_summary = list(unique_error_map.values())
-            error_summary.sort(key=lambda x: x["span"]["start"])
-
             rb = rubric_json.get("rubric", {})
+            if not isinstance(rb, dict): rb = {}
 
-            # Uzunluk puanını kodda hesapla — LLM'e bırakma
-            if word_count >= cefr_max:
-                uzunluk_puan = 16
-            elif word_count >= cefr_min:
-                uzunluk_puan = 12
-            elif word_count >= cefr_min * 0.75:
-                uzunluk_puan = 8
-            elif word_count >= cefr_min * 0.5:
-                uzunluk_puan = 4
-            else:
-                uzunluk_puan = 1
-
-            # Hata tipine göre dil bilgisi ve söz dizimi puanlarını kodda hesapla
-            # Sadece rule-based ve LLM_SEMANTIC hataları say, OCR kaynaklıları sayma
-            dil_hatalari = [e for e in error_summary if e.get("type") in ("Yazım", "Büyük Harf", "Noktalama") or e.get("rule_id", "").startswith("TDK_")]
-            soz_hatalari = [e for e in error_summary if e.get("rule_id") == "LLM_SEMANTIC" and e.get("type") not in ("Yazım", "Büyük Harf")]
-
-            dil_hata_orani = len(dil_hatalari) / max(word_count, 1)
-            soz_hata_orani = len(soz_hatalari) / max(word_count, 1)
-
-            # Dil Bilgisi (maks 16): hata oranına göre
-            if dil_hata_orani == 0:
-                dil_bilgisi_puan = 16
-            elif dil_hata_orani <= 0.03:
-                dil_bilgisi_puan = 12
-            elif dil_hata_orani <= 0.07:
-                dil_bilgisi_puan = 8
-            elif dil_hata_orani <= 0.12:
-                dil_bilgisi_puan = 4
-            else:
-                dil_bilgisi_puan = 1
-
-            # Söz Dizimi (maks 20): LLM puanını baz al ama OCR etkisini sınırla
-            # LLM'in verdiği puanı al, ama minimum 8 olsun (OCR bozukluğu cezası engellensin)
-            llm_soz = to_int(rb.get("soz_dizimi"), 10)
-            soz_dizimi_puan = max(llm_soz, 8) if word_count >= cefr_min else llm_soz
-
-            rubric = {
-                "uzunluk": uzunluk_puan,
-                "noktalama": to_int(rb.get("noktalama"), 7),
-                "dil_bilgisi": dil_bilgisi_puan,
-                "soz_dizimi": soz_dizimi_puan,
-                "kelime": to_int(rb.get("kelime"), 7),
-                "icerik": to_int(rb.get("icerik"), 10),
-            }
-            total_score = sum(rubric.values())
-
-            yz_notu = rubric_json.get("teacher_note", "")
-            if not yz_notu or yz_notu in ["...", "Detaylı değerlendirme yazısı."]:
-                yz_notu = "Yapay zeka değerlendirmesi başarıyla tamamlandı."
-
-            final_result = {
-                "score_total": total_score,
-                "rubric": rubric,
-                "errors": all_errors,           
-                "error_summary": error_summary, 
-                "errors_ocr": llm_json.get("ocr_suspects", []),
-                "teacher_note": yz_notu,
-                "ai_insight": yz_notu
-            }
+            llm_result = (llm_json, raw_llm_errors, rubric_json, rb)
             break
 
         except Exception as e:
             print(f"LLM Hata ({model_name}): {e}")
             continue
 
-    if not final_result:
+    if not llm_result:
+        raise HTTPException(status_code=500, detail="Analiz başarısız oldu.")
+
+    llm_json, raw_llm_errors, rubric_json, rb = llm_result
+    # Birleştirme/rübrik hatası LLM'i yeniden çağırmamalı; bu yüzden model döngüsünün dışında
+    try:
+        all_errors, error_summary, rubric = await run_cpu_bound(
+            finalize_analysis, full_text, rule_errors, raw_llm_errors, word_count, cefr_min, cefr_max, rb
+        )
+    except Exception as e:
+        print(f"Analiz Son İşlem Hatası: {e}")
         raise HTTPException(status_code=500, detail="Analiz başarısız oldu.")
+    total_score = sum(rubric.values())
+
+    yz_notu = rubric_json.get("teacher_note", "")
+    if not yz_notu or yz_notu in ["...", "Detaylı değerlendirme yazısı."]:
+        yz_notu = "Yapay zeka değerlendirmesi başarıyla tamamlandı."
+
+    final_result = {
+        "score_total": total_score,
+        "rubric": rubric,
+        "errors": all_errors,           
+        "error_summary": error_summary, 
+        "errors_ocr": llm_json.get("ocr_suspects", []),
+        "teacher_note": yz_notu,
+        "ai_insight": yz_notu,
+        "image_urls": data.image_urls or ([data.image_url] if data.image_url else [])
+    }
 
     try:
         supabase.table("submissions").insert({
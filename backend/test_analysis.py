@@ -0,0 +1,48 @@
+
+from analysis import analyze_deterministic, merge_errors, compute_rubric, finalize_analysis, create_analysis_pool
+
+TEXT = "Herşey yada güzel. Okula gittinmi? Otobüs istadyuma gitti."
+LLM_ERRORS = [
+    {"wrong": "istadyuma", "correct": "stadyuma", "explanation": "Yanlış yazım."},
+    {"wrong": "yada", "correct": "ya da", "explanation": "Kural hatasıyla çakışır."},
+    {"wrong": "bulunmayan", "correct": "x", "explanation": "Metinde yok."},
+    {"wrong": "", "correct": "x"},
+]
+
+
+def test_merge_errors_drops_overlaps_and_dedups_by_word():
+    rule_errors = analyze_deterministic(TEXT)
+    all_errors, summary = merge_errors(TEXT, rule_errors, LLM_ERRORS)
+
+    llm = [e for e in all_errors if e["source"] == "LLM"]
+    assert [e["wrong"] for e in llm] == ["istadyuma"]
+    assert [e["span"]["start"] for e in all_errors] == sorted(e["span"]["start"] for e in all_errors)
+    # "Herşey" iki kuralla yakalanır ama özet kartlarında bir kez görünür
+    assert sum(e["wrong"] == "Herşey" for e in all_errors) == 2
+    assert sum(e["wrong"] == "Herşey" for e in summary) == 1
+
+
+def test_compute_rubric_scores_length_and_grammar_in_code():
+    rubric = compute_rubric(210, 200, 300, [], {"soz_dizimi": "3/20", "noktalama": 11})
+    assert rubric == {"uzunluk": 12, "noktalama": 11, "dil_bilgisi": 16, "soz_dizimi": 8, "kelime": 7, "icerik": 10}
+
+    errors = [{"type": "Yazım", "rule_id": "TDK_06_YA_DA"}] * 20
+    rubric = compute_rubric(40, 200, 300, errors, {})
+    assert rubric["uzunluk"] == 1
+    assert rubric["dil_bilgisi"] == 1
+    assert rubric["soz_dizimi"] == 10
+
+
+def test_finalize_analysis_same_inline_and_in_pool():
+    words = len(TEXT.split())
+    args = (TEXT, analyze_deterministic(TEXT), LLM_ERRORS, words, 30, 50, {"kelime": 9})
+    pool = create_analysis_pool(1)
+    try:
+        assert pool.submit(analyze_deterministic, TEXT).result(timeout=60) == args[1]
+        assert pool.submit(finalize_analysis, *args).result(timeout=60) == finalize_analysis(*args)
+    finally:
+        pool.shutdown()
+
+
+def test_create_analysis_pool_disabled_by_default():
+    assert create_analysis_pool(0) is None
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+import dedup
+from dedup import image_hash, cache_get, cache_put, is_duplicate_upload, plan_pages, upload_image, dedup_report
+
+
+class StorageException(Exception):
+    """storage3'ün hata biçimi: ilk argüman Storage'ın JSON gövdesi."""
+
+
+class FakeBucket:
+    def __init__(self, fail_with=None):
+        self.objects = {}
+        self.uploads = 0
+        self.fail_with = fail_with
+
+    def upload(self, name, content, options):
+        self.uploads += 1
+        if self.fail_with: raise self.fail_with
+        if name in self.objects:
+            raise StorageException({"statusCode": "409", "error": "Duplicate", "message": "The resource already exists"})
+        self.objects[name] = content
+
+    def get_public_url(self, name):
+        return f"https://storage.example/odevler/{name}"
+
+
+@pytest.fixture(autouse=True)
+def fresh_state():
+    dedup.OCR_RESULT_CACHE.clear()
+    dedup.IMAGE_URL_CACHE.clear()
+    for key in dedup.DEDUP_STATS: dedup.DEDUP_STATS[key] = 0
+
+
+def test_cache_put_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(dedup, "OCR_CACHE_SIZE", 2)
+    cache = dedup.OCR_RESULT_CACHE
+    cache_put(cache, "a", 1)
+    cache_put(cache, "b", 2)
+    assert cache_get(cache, "a") == 1  # "a" artık en yeni
+    cache_put(cache, "c", 3)
+    assert list(cache) == ["a", "c"]
+    assert cache_get(cache, "b") is None
+
+
+def test_is_duplicate_upload_reads_structured_payload():
+    assert is_duplicate_upload(StorageException({"statusCode": "409", "error": "Duplicate", "message": "x"}))
+    assert is_duplicate_upload(StorageException({"statusCode": 409, "error": "Conflict"}))
+    # Hash'te "409" geçen ama yapısal olarak başka bir hata duplicate sayılmaz
+    digest = "ab409" + "0" * 59
+    assert not is_duplicate_upload(StorageException({"statusCode": "500", "error": "Internal", "message": f"{digest}.jpg failed"}))
+    assert not is_duplicate_upload(RuntimeError(f"409 timeout on {digest}.jpg"))
+
+
+def test_plan_pages_cache_hit_and_in_request_duplicates():
+    page1, page2 = b"sayfa-1" * 10, b"sayfa-2" * 20
+    cache_put(dedup.OCR_RESULT_CACHE, image_hash(page1), ("m", "r", 0.9))
+
+    digests, unique, page_results, pending = plan_pages([page1, page2, page2])
+
+    assert digests == [image_hash(page1), image_hash(page2), image_hash(page2)]
+    assert list(unique) == [image_hash(page1), image_hash(page2)]
+    assert page_results[image_hash(page1)] == ("m", "r", 0.9)
+    assert pending == [image_hash(page2)]
+    assert dedup.DEDUP_STATS == {"pages_total": 3, "uploads_skipped": 1, "bytes_saved": len(page2), "vision_pages_saved": 2}
+
+
+def test_upload_image_uploads_once_then_serves_cached_url():
+    bucket, page = FakeBucket(), b"sayfa" * 100
+    digest = image_hash(page)
+
+    url = asyncio.run(upload_image(bucket, page, digest))
+    assert url.endswith(f"{digest}.jpg")
+    assert asyncio.run(upload_image(bucket, page, digest)) == url
+    assert bucket.uploads == 1
+    assert dedup.DEDUP_STATS["uploads_skipped"] == 1
+    assert dedup.DEDUP_STATS["bytes_saved"] == len(page)
+
+
+def test_upload_image_treats_409_as_dedup_hit():
+    bucket, page = FakeBucket(), b"sayfa" * 100
+    digest = image_hash(page)
+    bucket.objects[f"{digest}.jpg"] = page  # başka bir süreç/istek önce yüklemiş
+
+    url = asyncio.run(upload_image(bucket, page, digest))
+    assert url.endswith(f"{digest}.jpg")
+    assert dedup.IMAGE_URL_CACHE[digest] == url
+    assert dedup.DEDUP_STATS["uploads_skipped"] == 1
+
+
+def test_upload_image_failure_is_not_cached():
+    page = b"sayfa" * 100
+    digest = image_hash(page)
+    bucket = FakeBucket(fail_with=StorageException({"statusCode": "500", "error": "Internal", "message": f"{digest}.jpg"}))
+
+    assert asyncio.run(upload_image(bucket, page, digest)) == ""
+    assert digest not in dedup.IMAGE_URL_CACHE
+    assert dedup.DEDUP_STATS["uploads_skipped"] == 0
+
+
+def test_dedup_report_estimates_vision_savings():
+    dedup.DEDUP_STATS["vision_pages_saved"] = 1000
+    cache_put(dedup.OCR_RESULT_CACHE, "x", ("m", "r", 1.0))
+    report = dedup_report()
+    assert report["vision_usd_saved"] == 1.5
+    assert report["cached_results"] == 1
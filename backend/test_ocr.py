@@ -0,0 +1,58 @@
+from types import SimpleNamespace as NS
+
+from analysis import extract_page_text, merge_pages, split_vision_batches
+
+
+def make_annotation(words):
+    """words: [(metin, [sembol güvenleri])]; her kelimeden sonra boşluk (break type 1)."""
+    word_nodes = []
+    for text, confs in words:
+        symbols = [NS(text=ch, confidence=c, property=None) for ch, c in zip(text, confs)]
+        symbols[-1].property = NS(detected_break=NS(type_=1))
+        word_nodes.append(NS(symbols=symbols))
+    return NS(pages=[NS(blocks=[NS(paragraphs=[NS(words=word_nodes)])])])
+
+
+def test_extract_page_text_masks_low_confidence_letters():
+    annotation = make_annotation([("Okul", [0.9, 0.9, 0.3, 0.9]), ("güzel.", [0.9] * 6)])
+    masked, raw, conf = extract_page_text(annotation)
+    assert raw == "Okul güzel."
+    assert masked == "Ok⍰l güzel."
+    assert conf == round((0.9 * 9 + 0.3) / 10, 3)
+
+
+def test_extract_page_text_empty_page():
+    assert extract_page_text(NS(pages=[])) == ("", "", 0.0)
+
+
+def test_merge_pages_keeps_upload_order_and_per_page_confidence():
+    pages = [
+        extract_page_text(make_annotation([("Birinci", [1.0] * 8)])),
+        extract_page_text(NS(pages=[])),
+        extract_page_text(make_annotation([("İkinci", [0.5] * 6)])),
+    ]
+    masked, raw, confidences = merge_pages(pages)
+    assert raw == "Birinci\nİkinci"
+    assert masked == "Birinci\n⍰⍰⍰⍰⍰⍰"
+    assert confidences == [1.0, 0.0, 0.5]
+
+
+def test_merge_pages_flags_suspect_words():
+    masked, raw, _ = merge_pages([("gok güzel", "gok güzel", 0.9)])
+    assert masked == "⍰ok güzel"
+    assert raw == "gok güzel"
+
+
+def test_split_vision_batches_respects_byte_and_count_limits():
+    mb = 1024 * 1024
+    # 5 x 6 MB tek istekte 30 MB olurdu; her batch 9 MB altında kalmalı
+    assert split_vision_batches([6 * mb] * 5, 9 * mb, 16) == [[0], [1], [2], [3], [4]]
+    assert split_vision_batches([3 * mb, 4 * mb, 2 * mb, 5 * mb], 9 * mb, 16) == [[0, 1, 2], [3]]
+    assert split_vision_batches([1] * 5, 9 * mb, 2) == [[0, 1], [2, 3], [4]]
+
+
+def test_split_vision_batches_keeps_order_and_oversized_page_alone():
+    batches = split_vision_batches([1, 20, 1, 1], 10, 16)
+    assert batches == [[0], [1], [2, 3]]
+    assert [i for b in batches for i in b] == [0, 1, 2, 3]
+    assert split_vision_batches([], 10, 16) == []
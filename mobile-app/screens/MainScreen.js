@@ -9,6 +9,7 @@ import axios from 'axios';
 
 // --- AYARLAR ---
 const BASE_URL = 'https://sanalogretmenai.onrender.com';
+const MAX_PAGES = 5; // Backend'deki MAX_OCR_PAGES ile aynı
 const { width: SCREEN_WIDTH, height: SCREEN_HEIGHT } = Dimensions.get('window');
 
 // --- TDK KURAL SÖZLÜĞÜ (BACKEND İLE UYUMLU) ---
@@ -280,8 +281,9 @@ export default function MainScreen({ user, setUser }) {
   const [activeOcrHintData, setActiveOcrHintData] = useState(null);
 
   const [step, setStep] = useState(1);
-  const [image, setImage] = useState(null);
+  const [images, setImages] = useState([]); // Uzun ödevlerde birden fazla sayfa
   const [imageUrl, setImageUrl] = useState("");
+  const [imageUrls, setImageUrls] = useState([]);
   const [loading, setLoading] = useState(false);
 
   const [ocrText, setOcrText] = useState("");
@@ -322,10 +324,11 @@ export default function MainScreen({ user, setUser }) {
 
   const resetFlow = () => {
     setStep(1);
-    setImage(null);
+    setImages([]);
     setOcrText("");
     setResult(null);
     setImageUrl("");
+    setImageUrls([]);
     setActiveErrorData(null);
     setActiveOcrHintData(null);
   };
@@ -336,7 +339,7 @@ export default function MainScreen({ user, setUser }) {
     const res = await ImagePicker.launchCameraAsync({
       mediaTypes: ImagePicker.MediaTypeOptions.Images, allowsEditing: true, aspect: [3, 4], quality: 0.7, base64: true
     });
-    if (!res.canceled) { resetFlow(); setImage(res.assets[0]); }
+    if (!res.canceled) addPage(res.assets[0]);
   };
 
   const pickImage = async () => {
@@ -345,26 +348,38 @@ export default function MainScreen({ user, setUser }) {
     const res = await ImagePicker.launchImageLibraryAsync({
       mediaTypes: ImagePicker.MediaTypeOptions.Images, allowsEditing: true, aspect: [3, 4], quality: 0.7, base64: true
     });
-    if (!res.canceled) { resetFlow(); setImage(res.assets[0]); }
+    if (!res.canceled) addPage(res.assets[0]);
   };
 
+  // Yeni sayfa mevcut sayfalara eklenir; tarama sonrası seçilen fotoğraf yeni bir ödev başlatır
+  const addPage = (asset) => {
+    if (step !== 1) resetFlow();
+    else if (images.length >= MAX_PAGES) return showAlert("Uyarı", `En fazla ${MAX_PAGES} sayfa eklenebilir.`);
+    setImages(prev => [...prev, asset]);
+  };
+
+  const removePage = (idx) => setImages(prev => prev.filter((_, i) => i !== idx));
+
   const startOCR = async () => {
-    if (!image) return showAlert("Uyarı", "Lütfen fotoğraf seçin.");
+    if (images.length === 0) return showAlert("Uyarı", "Lütfen fotoğraf seçin.");
     setLoading(true);
     try {
       const formData = new FormData();
-      let localUri = image.uri;
-      let filename = localUri.split('/').pop();
-      if (Platform.OS === 'web' && !filename) filename = "upload.jpg";
-      let match = /\.(\w+)$/.exec(filename);
-      let type = match ? `image/${match[1]}` : `image/jpeg`;
-
-      if (Platform.OS === 'web') {
-        const res = await fetch(localUri);
-        const blob = await res.blob();
-        formData.append('file', blob, filename);
-      } else {
-        formData.append('file', { uri: localUri, name: filename, type: type });
+      // Her sayfa ayrı bir 'file' alanı; backend hepsini sırasıyla tek istekte okur
+      for (const [idx, page] of images.entries()) {
+        let localUri = page.uri;
+        let filename = localUri.split('/').pop();
+        if (Platform.OS === 'web' && !filename) filename = `sayfa${idx + 1}.jpg`;
+        let match = /\.(\w+)$/.exec(filename);
+        let type = match ? `image/${match[1]}` : `image/jpeg`;
+
+        if (Platform.OS === 'web') {
+          const res = await fetch(localUri);
+          const blob = await res.blob();
+          formData.append('file', blob, filename);
+        } else {
+          formData.append('file', { uri: localUri, name: filename, type: type });
+        }
       }
       formData.append('classroom_code', classCode);
 
@@ -373,7 +388,10 @@ export default function MainScreen({ user, setUser }) {
         // ✅ GÜNCELLEME: Gelen metni normalize et
         setOcrText(normalizeNFC(response.data.ocr_text || ""));
         setImageUrl(response.data.image_url || "");
+        setImageUrls(response.data.image_urls || []);
         setStep(2);
+      } else {
+        showAlert("Hata", response.data.message || "Metin okunamadı.");
       }
     } catch (error) {
       showAlert("Hata", "Metin okunamadı.");
@@ -408,6 +426,7 @@ export default function MainScreen({ user, setUser }) {
       const payload = {
         ocr_text: ocrText,
         image_url: imageUrl,
+        image_urls: imageUrls,
         student_name: studentName,
         student_surname: studentSurname,
         classroom_code: classCode,
@@ -472,21 +491,36 @@ export default function MainScreen({ user, setUser }) {
             <View style={styles.card}>
               <Text style={styles.cardTitle}>{step === 1 ? "1. Fotoğraf Yükle" : step === 2 ? "2. Metni Kontrol Et" : "3. Sonuçlar"}</Text>
 
-              {image && (
+              {images.length === 1 && (
                 <View style={styles.previewContainer}>
-                  <Image source={{ uri: image.uri }} style={styles.previewImage} />
-                  {step === 1 && <TouchableOpacity style={styles.removeButton} onPress={resetFlow}><Text style={styles.removeButtonText}>X</Text></TouchableOpacity>}
+                  <Image source={{ uri: images[0].uri }} style={styles.previewImage} />
+                  {step === 1 && <TouchableOpacity style={styles.removeButton} onPress={() => removePage(0)}><Text style={styles.removeButtonText}>X</Text></TouchableOpacity>}
                 </View>
               )}
 
+              {images.length > 1 && (
+                <ScrollView horizontal style={{ width: '100%', marginBottom: 20 }}>
+                  {images.map((page, idx) => (
+                    <View key={`${page.uri}-${idx}`} style={[styles.previewContainer, styles.pagePreview]}>
+                      <Image source={{ uri: page.uri }} style={styles.previewImage} />
+                      <Text style={styles.pageBadge}>Sayfa {idx + 1}</Text>
+                      {step === 1 && <TouchableOpacity style={styles.removeButton} onPress={() => removePage(idx)}><Text style={styles.removeButtonText}>X</Text></TouchableOpacity>}
+                    </View>
+                  ))}
+                </ScrollView>
+              )}
+
               {step === 1 && (
                 <>
-                  {!image && <View style={styles.placeholder}><Text style={{ color: '#ccc' }}>Fotoğraf Yok</Text></View>}
+                  {images.length === 0 && <View style={styles.placeholder}><Text style={{ color: '#ccc' }}>Fotoğraf Yok</Text></View>}
+                  {images.length > 0 && images.length < MAX_PAGES && (
+                    <Text style={styles.pageHint}>Ödev birden fazla sayfaysa diğer sayfaları da ekleyin (en fazla {MAX_PAGES}).</Text>
+                  )}
                   <View style={styles.buttonRow}>
                     <TouchableOpacity style={[styles.actionButton, { backgroundColor: '#3498db' }]} onPress={takePhoto}><Text style={styles.btnText}>📷 Kamera</Text></TouchableOpacity>
                     <TouchableOpacity style={[styles.actionButton, { backgroundColor: '#9b59b6' }]} onPress={pickImage}><Text style={styles.btnText}>🖼️ Galeri</Text></TouchableOpacity>
                   </View>
-                  <TouchableOpacity style={[styles.sendButton, { opacity: image ? 1 : 0.5 }]} onPress={startOCR} disabled={!image || loading}>
+                  <TouchableOpacity style={[styles.sendButton, { opacity: images.length ? 1 : 0.5 }]} onPress={startOCR} disabled={!images.length || loading}>
                     {loading ? <ActivityIndicator color="white" /> : <Text style={styles.sendButtonText}>Metni Tara 🔍</Text>}
                   </TouchableOpacity>
                 </>
@@ -729,6 +763,9 @@ const styles = StyleSheet.create({
   placeholder: { width: '100%', height: 200, backgroundColor: '#f1f2f6', borderRadius: 15, justifyContent: 'center', alignItems: 'center', marginBottom: 20, borderWidth: 2, borderColor: '#e1e1e1', borderStyle: 'dashed' },
   previewContainer: { width: '100%', height: 250, marginBottom: 20, borderRadius: 15, overflow: 'hidden', position: 'relative' },
   previewImage: { width: '100%', height: '100%', resizeMode: 'contain' },
+  pagePreview: { width: 180, marginBottom: 0, marginRight: 10 },
+  pageBadge: { position: 'absolute', bottom: 10, left: 10, backgroundColor: 'rgba(0,0,0,0.6)', color: 'white', fontSize: 12, fontWeight: 'bold', paddingHorizontal: 8, paddingVertical: 3, borderRadius: 10 },
+  pageHint: { color: '#7f8c8d', fontSize: 12, marginBottom: 10, textAlign: 'center' },
   removeButton: { position: 'absolute', top: 10, right: 10, backgroundColor: 'rgba(0,0,0,0.6)', width: 30, height: 30, borderRadius: 15, justifyContent: 'center', alignItems: 'center' },
   removeButtonText: { color: 'white', fontWeight: 'bold' },
   buttonRow: { flexDirection: 'row', gap: 15, width: '100%', marginBottom: 15 },
@@ -622,6 +622,7 @@ export default function App() {
   const [filteredSubmissions, setFilteredSubmissions] = useState([]);
   const [selectedSubmission, setSelectedSubmission] = useState(null);
   const [showImageModal, setShowImageModal] = useState(false);
+  const [activePage, setActivePage] = useState(0);
 
   // tdk popover
   const [activeError, setActiveError] = useState(null);
@@ -688,6 +689,11 @@ export default function App() {
   }, [selectedClassCode, submissions]);
 
   // --- VERİ YÜKLEME VE EŞLEŞTİRME (PUANLAR BURADA YÜKLENİR) ---
+  // Başka bir ödev açılınca ilk sayfaya dön (puan kaydı aynı ödevi yenilediğinde değil)
+  useEffect(() => {
+    setActivePage(0);
+  }, [selectedSubmission?.id]);
+
   // --- VERİ YÜKLEME VE PUANLARI EŞLEŞTİRME ---
   useEffect(() => {
     if (selectedSubmission) {
@@ -1659,11 +1665,17 @@ export default function App() {
   }
 
   // --- DETAY (ESKİ 3 SÜTUN) ---
+  // Çok sayfalı ödevlerde tüm sayfalar analysis_json.image_urls içinde; eski kayıtlarda sadece image_url var
+  const pageUrls = selectedSubmission.analysis_json?.image_urls?.length
+    ? selectedSubmission.analysis_json.image_urls
+    : [selectedSubmission.image_url].filter(Boolean);
+  const activePageUrl = pageUrls[Math.min(activePage, pageUrls.length - 1)];
+
   return (
     <div style={{ padding: "30px", fontFamily: "'Segoe UI', Tahoma, Geneva, Verdana, sans-serif", backgroundColor: "#f4f6f8", minHeight: "100vh" }}>
       <style>{globalStyles}</style>
 
-      {showImageModal && <ImageViewerModal src={selectedSubmission.image_url} onClose={() => setShowImageModal(false)} />}
+      {showImageModal && <ImageViewerModal src={activePageUrl} onClose={() => setShowImageModal(false)} />}
 
       <div style={{ display: "flex", justifyContent: "space-between", alignItems: "center", marginBottom: 20 }}>
         <button
@@ -1775,8 +1787,8 @@ export default function App() {
                   position: "relative",
                 }}
               >
-                {selectedSubmission.image_url ? (
-                  <img src={selectedSubmission.image_url} alt="Ödev" style={{ width: "100%", height: "100%", objectFit: "contain" }} />
+                {activePageUrl ? (
+                  <img src={activePageUrl} alt="Ödev" style={{ width: "100%", height: "100%", objectFit: "contain" }} />
                 ) : (
                   <span style={{ color: "#ccc" }}>Resim Yok</span>
                 )}
@@ -1799,6 +1811,29 @@ export default function App() {
                   <Maximize2 size={12} /> Büyüt
                 </div>
               </div>
+
+              {pageUrls.length > 1 && (
+                <div style={{ display: "flex", justifyContent: "center", gap: 8, marginTop: 12 }}>
+                  {pageUrls.map((_, idx) => (
+                    <button
+                      key={idx}
+                      onClick={() => setActivePage(idx)}
+                      style={{
+                        padding: "5px 12px",
+                        borderRadius: 6,
+                        border: "1px solid #dfe6e9",
+                        cursor: "pointer",
+                        fontSize: 12,
+                        fontWeight: "bold",
+                        backgroundColor: idx === activePage ? "#3498db" : "white",
+                        color: idx === activePage ? "white" : "#2c3e50",
+                      }}
+                    >
+                      Sayfa {idx + 1}
+                    </button>
+                  ))}
+                </div>
+              )}
             </div>
 
 